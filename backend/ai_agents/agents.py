@@ -1,12 +1,16 @@
 # Extensible AI agents with LangChain and MCP support
 
 from typing import Dict, Any, Optional, List
+import asyncio
 import os
+import re
 import logging
+import traceback
 from dataclasses import dataclass
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
@@ -96,7 +100,6 @@ class BaseAgent:
                 self.mcp_tools = []
         except Exception as e:
             logger.error(f"Failed to setup MCP: {e}")
-            import traceback
             traceback.print_exc()
             self.mcp_client = None
             self.mcp_tools = []
@@ -112,8 +115,6 @@ class BaseAgent:
             # Use MCP tools with LangGraph if available
             if use_tools and self.mcp_client and self.mcp_tools:
                 # Use LangGraph's create_react_agent (simple form)
-                from langgraph.prebuilt import create_react_agent
-                
                 logger.info(f"Creating agent with {len(self.mcp_tools)} tools")
                 
                 # Create LangGraph agent with tools (no checkpointer for simplicity)
@@ -184,7 +185,6 @@ class BaseAgent:
             
         except Exception as e:
             logger.error(f"Error executing agent: {e}")
-            import traceback
             traceback.print_exc()
             return AgentResponse(
                 success=False,
@@ -214,26 +214,29 @@ Cite sources from your search results."""
         
         # Store setup flag
         self._mcp_setup_done = False
+        self._mcp_setup_lock = asyncio.Lock()
     
     async def setup_web_search_mcp(self):
         # Setup web search MCP with auth token
-        if self._mcp_setup_done:
-            return
+        # Serialise setup so concurrent first callers don't build competing MCP clients
+        async with self._mcp_setup_lock:
+            if self._mcp_setup_done:
+                return
             
-        mcp_token = os.getenv("CODEXHUB_MCP_AUTH_TOKEN")
-        if mcp_token and mcp_token != "dummy-key":
-            server_configs = {
-                "web-search": {
-                    "transport": "streamable_http",
-                    "url": "https://mcp.codexhub.ai/web/mcp",
-                    "headers": {"x-team-key": mcp_token}
+            mcp_token = os.getenv("CODEXHUB_MCP_AUTH_TOKEN")
+            if mcp_token and mcp_token != "dummy-key":
+                server_configs = {
+                    "web-search": {
+                        "transport": "streamable_http",
+                        "url": "https://mcp.codexhub.ai/web/mcp",
+                        "headers": {"x-team-key": mcp_token}
+                    }
                 }
-            }
-            await self.setup_mcp(server_configs)
-            self._mcp_setup_done = True
-            logger.info("Web search MCP configured")
-        else:
-            logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, web search disabled")
+                await self.setup_mcp(server_configs)
+                self._mcp_setup_done = True
+                logger.info("Web search MCP configured")
+            else:
+                logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, web search disabled")
     
     async def execute(self, prompt: str, use_tools: bool = True) -> AgentResponse:
         # Ensure MCP is setup before execution
@@ -264,26 +267,29 @@ Provide responses in a clear, structured format."""
         
         # Store setup flag
         self._mcp_setup_done = False
+        self._mcp_setup_lock = asyncio.Lock()
     
     async def setup_image_mcp(self):
         # Setup image generation MCP with auth token
-        if self._mcp_setup_done:
-            return
+        # Serialise setup so concurrent first callers don't build competing MCP clients
+        async with self._mcp_setup_lock:
+            if self._mcp_setup_done:
+                return
             
-        mcp_token = os.getenv("CODEXHUB_MCP_AUTH_TOKEN")
-        if mcp_token and mcp_token != "dummy-key":
-            server_configs = {
-                "image-generation": {
-                    "transport": "streamable_http",
-                    "url": "https://mcp.codexhub.ai/image/mcp",
-                    "headers": {"x-team-key": mcp_token}
+            mcp_token = os.getenv("CODEXHUB_MCP_AUTH_TOKEN")
+            if mcp_token and mcp_token != "dummy-key":
+                server_configs = {
+                    "image-generation": {
+                        "transport": "streamable_http",
+                        "url": "https://mcp.codexhub.ai/image/mcp",
+                        "headers": {"x-team-key": mcp_token}
+                    }
                 }
-            }
-            await self.setup_mcp(server_configs)
-            self._mcp_setup_done = True
-            logger.info("Image generation MCP configured")
-        else:
-            logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, image generation disabled")
+                await self.setup_mcp(server_configs)
+                self._mcp_setup_done = True
+                logger.info("Image generation MCP configured")
+            else:
+                logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, image generation disabled")
     
     async def execute(self, prompt: str, use_tools: bool = True) -> AgentResponse:
         # Ensure MCP is setup before execution
@@ -312,7 +318,6 @@ Provide responses in a clear, structured format."""
         
         if response.success and tools_used:
             # Parse the response to extract structured data
-            import re
             urls = re.findall(r'https?://[^\s\)]+', response.content)
             
             # Validate that it's a real Google Cloud Storage URL, not fabricated
@@ -0,0 +1,41 @@
+"""Small asyncio helpers shared by the API and the image generator."""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+async def coalesce(
+    registry: Dict[Hashable, asyncio.Future],
+    key: Hashable,
+    fn: Callable[[], Awaitable[T]],
+) -> Optional[T]:
+    """
+    Run fn once per key at a time, sharing its result with concurrent callers.
+
+    The first caller for a key runs fn; callers arriving while it is in flight
+    await the same result instead. If fn raises, the first caller sees the
+    exception and the others receive None.
+
+    Args:
+        registry: Dict holding the in-flight futures, owned by the caller
+        key: Identity of the work being coalesced
+        fn: Coroutine factory doing the work
+
+    Returns:
+        The result of fn, or None for followers of a failed call
+    """
+    if key in registry:
+        return await asyncio.shield(registry[key])
+
+    future = asyncio.get_running_loop().create_future()
+    registry[key] = future
+    try:
+        result = await fn()
+        future.set_result(result)
+        return result
+    finally:
+        del registry[key]
+        if not future.done():
+            future.set_result(None)
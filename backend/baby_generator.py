@@ -1,25 +1,178 @@
 """Baby image generation and age progression module."""
 
+import asyncio
 import base64
+import binascii
 import io
 import logging
 import re
-from typing import Optional
-from PIL import Image, ImageDraw, ImageFont
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+from PIL import Image, ImageFont
 
 from ai_agents.agents import AgentConfig, ImageAgent
+from async_utils import coalesce
 
 logger = logging.getLogger(__name__)
 
+WATERMARK_FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# Longer labels are rendered per call instead of being pinned in the strip cache
+WATERMARK_CACHE_MAX_CHARS = 64
+
+_URL_RE = re.compile(r'https?://[^\s)]+')
+
+_DEFAULT_FONT = ImageFont.load_default()
+
+
+@lru_cache(maxsize=32)
+def _get_font(size: int):
+    """Load the watermark font once per size instead of on every call."""
+    try:
+        return ImageFont.truetype(WATERMARK_FONT_PATH, size)
+    except Exception:
+        return _DEFAULT_FONT
+
+
+def _render_watermark_strip(name: str, age: str, font_size: int) -> Image.Image:
+    """Render the watermark label as an RGBA strip ready to be pasted."""
+    font = _get_font(font_size)
+    padding = 10
+    watermark_text = f"{name} - {age}"
+
+    # Lay out and rasterise the text once; getmask() returns a mask of exactly the
+    # text's extent, including negative bearings, so nothing is clipped
+    text_mask = Image.Image()._new(font.getmask(watermark_text, mode="L"))
+    text_width, text_height = text_mask.size
+
+    strip = Image.new("RGBA", (text_width + 2 * padding, text_height + 2 * padding), (0, 0, 0, 180))
+    strip.paste((255, 255, 255, 255), (padding, padding), text_mask)
+    return strip
+
+
+_cached_watermark_strip = lru_cache(maxsize=64)(_render_watermark_strip)
+
+
+def _get_watermark_strip(name: str, age: str, font_size: int) -> Image.Image:
+    """Return the label strip, caching only short labels so the cache stays small."""
+    if len(name) + len(age) > WATERMARK_CACHE_MAX_CHARS:
+        return _render_watermark_strip(name, age, font_size)
+    return _cached_watermark_strip(name, age, font_size)
+
 
 class BabyImageGenerator:
     """Generate baby images and age progressions using AI."""
 
-    def __init__(self, config: AgentConfig):
+    def __init__(
+        self,
+        config: AgentConfig,
+        concurrency: int = 5,
+        cache_size: int = 32,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        watermark_max_edge: int = 1280,
+    ):
         self.config = config
         self.image_agent = ImageAgent(config)
+        self.concurrency = concurrency
+        self.cache_size = cache_size
+        self.cache_max_bytes = cache_max_bytes
+        self.watermark_max_edge = watermark_max_edge
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._cache_bytes = 0
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding in-flight image generations."""
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._sem
+
+    async def _get_http(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._http is None or self._http.closed:
+            # Pooled HTTP/1.1 keep-alive connections avoid a TLS handshake per download
+            connector = aiohttp.TCPConnector(
+                limit=20,
+                limit_per_host=10,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._http
+
+    async def _download(self, url: str) -> Optional[bytes]:
+        """Download an image without blocking the event loop."""
+        session = await self._get_http()
+        async with session.get(url) as response:
+            if response.status != 200:
+                logger.error(f"Image download failed with status {response.status}: {url}")
+                return None
+            return await response.read()
+
+    async def _cached(self, key: Tuple, generate: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """Return the cached image for key, sharing one generation between concurrent callers."""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        async def generate_and_cache() -> Optional[bytes]:
+            content = await generate()
+            if content and len(content) <= self.cache_max_bytes:
+                self._cache[key] = content
+                self._cache_bytes += len(content)
+                # Bound the cache by total bytes as well as entries so worker RSS stays flat
+                while len(self._cache) > self.cache_size or self._cache_bytes > self.cache_max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+            return content
+
+        return await coalesce(self._inflight, key, generate_and_cache)
+
+    async def _generate(self, prompt: str, label: str) -> Optional[bytes]:
+        """Run the image agent on prompt and download the resulting image."""
+        try:
+            async with self._get_semaphore():
+                result = await self.image_agent.execute(prompt, use_tools=True)
+
+                if result.success and result.metadata.get("tools_used"):
+                    # Extract URL from response
+                    match = _URL_RE.search(result.content)
+
+                    if match and 'storage.googleapis.com' in match.group():
+                        image_url = match.group()
+                        content = await self._download(image_url)
+                        if content:
+                            return content
+
+            logger.error(f"Failed to generate {label}: {result.error}")
+            return None
+
+        except Exception as e:
+            logger.error(f"Error generating {label}: {e}")
+            return None
+
+    async def warm_up(self):
+        """Connect the image tools and HTTP pool ahead of the first request."""
+        try:
+            await self.image_agent.setup_image_mcp()
+            await self._get_http()
+        except Exception as e:
+            logger.warning(f"Baby image generator warm-up failed: {e}")
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
 
-    async def generate_baby_image(self, name: str) -> Optional[str]:
+    async def generate_baby_image(self, name: str) -> Optional[bytes]:
         """
         Generate a photorealistic baby image for the given name.
 
@@ -27,7 +180,7 @@ class BabyImageGenerator:
             name: Baby's name
 
         Returns:
-            Base64 encoded image string or None if generation failed
+            Raw image bytes or None if generation failed
         """
         prompt = (
             f"Generate a photorealistic image of a cute baby named {name}. "
@@ -37,30 +190,9 @@ class BabyImageGenerator:
             "The image should be suitable for age progression with consistent facial attributes."
         )
 
-        try:
-            result = await self.image_agent.execute(prompt, use_tools=True)
-
-            if result.success and result.metadata.get("tools_used"):
-                # Extract URL from response
-                urls = re.findall(r'https?://[^\s\)]+', result.content)
-
-                if urls and 'storage.googleapis.com' in urls[0]:
-                    image_url = urls[0]
-                    # Download and convert to base64
-                    import requests
-                    response = requests.get(image_url, timeout=30)
-                    if response.status_code == 200:
-                        base64_image = base64.b64encode(response.content).decode('utf-8')
-                        return base64_image
-
-            logger.error(f"Failed to generate baby image: {result.error}")
-            return None
-
-        except Exception as e:
-            logger.error(f"Error generating baby image: {e}")
-            return None
+        return await self._cached(("baby", name), lambda: self._generate(prompt, "baby image"))
 
-    async def generate_aged_image(self, name: str, age_group: str, reference_description: str = "") -> Optional[str]:
+    async def generate_aged_image(self, name: str, age_group: str, reference_description: str = "") -> Optional[bytes]:
         """
         Generate an age-progressed version of the baby.
 
@@ -70,7 +202,7 @@ class BabyImageGenerator:
             reference_description: Description of original baby's features for consistency
 
         Returns:
-            Base64 encoded image string or None if generation failed
+            Raw image bytes or None if generation failed
         """
         age_prompts = {
             "baby": "a cute baby (0-2 years old)",
@@ -97,26 +229,63 @@ class BabyImageGenerator:
             f"The person should look natural and realistic for their age."
         )
 
-        try:
-            result = await self.image_agent.execute(prompt, use_tools=True)
+        return await self._cached(
+            ("aged", name, age_group, reference_description),
+            lambda: self._generate(prompt, "aged image")
+        )
 
-            if result.success and result.metadata.get("tools_used"):
-                urls = re.findall(r'https?://[^\s\)]+', result.content)
+    def _render_watermarked(self, image_data: bytes, name: str, age: str) -> io.BytesIO:
+        """Watermark an encoded image and return a buffer holding the resulting JPEG."""
+        image = Image.open(io.BytesIO(image_data))
 
-                if urls and 'storage.googleapis.com' in urls[0]:
-                    image_url = urls[0]
-                    import requests
-                    response = requests.get(image_url, timeout=30)
-                    if response.status_code == 200:
-                        base64_image = base64.b64encode(response.content).decode('utf-8')
-                        return base64_image
+        # Cap the longest edge so oversized upstream images stay cheap to encode
+        width, height = image.size
+        scale = min(1.0, self.watermark_max_edge / max(width, height))
+        target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
 
-            logger.error(f"Failed to generate aged image: {result.error}")
-            return None
+        # Let libjpeg decode straight to RGB, pre-shrinking where it can; no-op for other formats
+        image.draft('RGB', target_size)
+        # Decode pixels now so the compressed bytes can be released before encoding
+        image.load()
+        del image_data
 
-        except Exception as e:
-            logger.error(f"Error generating aged image: {e}")
-            return None
+        # Ensure RGB mode
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        if image.size != target_size:
+            image = image.resize(target_size, Image.Resampling.LANCZOS)
+
+        # Calculate font size based on image dimensions
+        width, height = image.size
+        # Round to 4px buckets so differently sized images share cached fonts
+        font_size = max(20, round(height * 0.04 / 4) * 4)
+
+        # Reuse the pre-rendered label across calls for the same name and age
+        strip = _get_watermark_strip(name, age, font_size)
+
+        # Position at bottom center, 10px above the bottom edge
+        x = (width - strip.width) // 2
+        y = height - strip.height - 10
+        image.paste(strip, (x, y), strip)
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=90, subsampling=2, optimize=False)
+        return output
+
+    def add_watermark_bytes(self, image_data: bytes, name: str, age: str) -> bytes:
+        """
+        Add name and age watermark to the image.
+
+        Args:
+            image_data: Encoded image bytes
+            name: Baby's name
+            age: Age label (e.g., "Baby", "Child", "Teen", "Adult")
+
+        Returns:
+            Watermarked image as JPEG bytes
+        """
+        return self._render_watermarked(image_data, name, age).getvalue()
 
     def add_watermark(self, base64_image: str, name: str, age: str) -> str:
         """
@@ -131,58 +300,12 @@ class BabyImageGenerator:
             Base64 encoded watermarked image
         """
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(base64_image)
-            image = Image.open(io.BytesIO(image_data))
-
-            # Ensure RGB mode
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-
-            # Create drawing context
-            draw = ImageDraw.Draw(image)
-
-            # Calculate font size based on image dimensions
-            width, height = image.size
-            font_size = max(20, int(height * 0.04))
-
-            # Try to use a nice font, fallback to default
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-            except Exception:
-                font = ImageFont.load_default()
-
-            # Prepare watermark text
-            watermark_text = f"{name} - {age}"
-
-            # Get text bounding box
-            bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-            # Position at bottom center
-            x = (width - text_width) // 2
-            y = height - text_height - 20
-
-            # Draw background rectangle
-            padding = 10
-            draw.rectangle(
-                [x - padding, y - padding, x + text_width + padding, y + text_height + padding],
-                fill=(0, 0, 0, 180)
-            )
-
-            # Draw text
-            draw.text((x, y), watermark_text, fill=(255, 255, 255), font=font)
-
-            # Convert back to base64
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=95)
-            output.seek(0)
-            watermarked_base64 = base64.b64encode(output.read()).decode('utf-8')
-
-            return watermarked_base64
+            output = self._render_watermarked(base64.b64decode(base64_image, validate=False), name, age)
+            # getbuffer() is a zero-copy view; b2a_base64 encodes it without an extra bytes copy
+            with output.getbuffer() as view:
+                return binascii.b2a_base64(view, newline=False).decode('ascii')
 
         except Exception as e:
             logger.error(f"Error adding watermark: {e}")
             # Return original image if watermarking fails
-            return base64_image
\ No newline at end of file
+            return base64_image
@@ -1,5 +1,7 @@
 """FastAPI server exposing AI agent endpoints."""
 
+import asyncio
+import base64
 import logging
 import os
 import uuid
@@ -7,15 +9,20 @@ import hashlib
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
+from bson import ObjectId
 from dotenv import load_dotenv
-from fastapi import APIRouter, FastAPI, HTTPException, Request
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from PIL import Image, UnidentifiedImageError
 from pydantic import BaseModel, Field
 from starlette.middleware.cors import CORSMiddleware
 
 from ai_agents.agents import AgentConfig, ChatAgent, SearchAgent
+from async_utils import coalesce
 from baby_generator import BabyImageGenerator
 
 
@@ -91,10 +98,22 @@ class AgeProgressResponse(BaseModel):
     error: Optional[str] = None
 
 
+class AgeProgressBulkRequest(BaseModel):
+    image_id: str
+    name: str
+    age_groups: List[str]
+
+
+class AgeProgressBulkResponse(BaseModel):
+    success: bool
+    images: Dict[str, str] = Field(default_factory=dict)
+    error: Optional[str] = None
+
+
 class WatermarkRequest(BaseModel):
     image_data: str
-    name: str
-    age: str
+    name: str = Field(max_length=100)
+    age: str = Field(max_length=20)
 
 
 class WatermarkResponse(BaseModel):
@@ -140,6 +159,70 @@ def _ensure_db(request: Request):
         raise HTTPException(status_code=503, detail="Database not ready") from exc
 
 
+def _ensure_image_bucket(request: Request) -> AsyncIOMotorGridFSBucket:
+    try:
+        return request.app.state.image_bucket
+    except AttributeError as exc:  # pragma: no cover - defensive
+        raise HTTPException(status_code=503, detail="Database not ready") from exc
+
+
+def _encode_image(content: bytes) -> str:
+    return base64.b64encode(content).decode("utf-8")
+
+
+# How many image digests to remember for reusing GridFS files
+STORED_IMAGE_DIGESTS = 256
+
+
+class _StoredImage(NamedTuple):
+    file_id: ObjectId
+    digest: str
+    created: bool
+
+
+def _get_stored_images(request: Request) -> "OrderedDict[str, ObjectId]":
+    if not hasattr(request.app.state, "stored_images"):
+        request.app.state.stored_images = OrderedDict()
+    return request.app.state.stored_images
+
+
+async def _store_image(
+    request: Request, bucket: AsyncIOMotorGridFSBucket, filename: str, content: bytes
+) -> _StoredImage:
+    """Upload image bytes to GridFS unless a record already references identical bytes."""
+    stored_images = _get_stored_images(request)
+    digest = hashlib.sha256(content).hexdigest()
+    if digest in stored_images:
+        # Generator cache hits return the same bytes; point at the existing file
+        stored_images.move_to_end(digest)
+        return _StoredImage(stored_images[digest], digest, created=False)
+
+    file_id = await bucket.upload_from_stream(filename, content, metadata={"sha256": digest})
+    return _StoredImage(file_id, digest, created=True)
+
+
+def _remember_stored_image(request: Request, stored: _StoredImage) -> None:
+    """Let identical bytes reuse a file once a record references it.
+
+    Only referenced files are shared, so deleting an unreferenced upload after a
+    lost conditional write can never break another record.
+    """
+    stored_images = _get_stored_images(request)
+    stored_images[stored.digest] = stored.file_id
+    stored_images.move_to_end(stored.digest)
+    if len(stored_images) > STORED_IMAGE_DIGESTS:
+        stored_images.popitem(last=False)
+
+
+async def _load_image(bucket: AsyncIOMotorGridFSBucket, image_ref) -> str:
+    """Return a stored image as base64, reading it from GridFS."""
+    if isinstance(image_ref, str):
+        # Records created before GridFS storage hold the base64 inline
+        return image_ref
+    stream = await bucket.open_download_stream(image_ref)
+    return _encode_image(await stream.read())
+
+
 def _get_agent_cache(request: Request) -> Dict[str, object]:
     if not hasattr(request.app.state, "agent_cache"):
         request.app.state.agent_cache = {}
@@ -163,11 +246,59 @@ async def _get_or_create_agent(request: Request, agent_type: str):
     return cache[agent_type]
 
 
+def _get_age_progress_inflight(request: Request) -> Dict[Tuple[str, str], asyncio.Future]:
+    if not hasattr(request.app.state, "age_progress_inflight"):
+        request.app.state.age_progress_inflight = {}
+    return request.app.state.age_progress_inflight
+
+
 def _get_baby_generator(request: Request) -> BabyImageGenerator:
-    if not hasattr(request.app.state, "baby_generator"):
-        config: AgentConfig = request.app.state.agent_config
-        request.app.state.baby_generator = BabyImageGenerator(config)
-    return request.app.state.baby_generator
+    try:
+        return request.app.state.baby_generator
+    except AttributeError as exc:  # pragma: no cover - defensive
+        raise HTTPException(status_code=503, detail="Baby image generator not ready") from exc
+
+
+async def _create_indexes(db) -> None:
+    await asyncio.gather(
+        db.baby_images.create_index([("created_at", -1)]),
+        db.status_checks.create_index([("timestamp", -1)]),
+        db.link_tracking.create_index([("link_id", 1)]),
+        db.users.create_index([("username", 1)]),
+    )
+
+
+async def _generate_age_version(
+    request: Request,
+    generator: BabyImageGenerator,
+    db,
+    bucket: AsyncIOMotorGridFSBucket,
+    image_id: str,
+    name: str,
+    age_group: str,
+) -> Optional[bytes]:
+    """Generate and cache one age version, coalescing concurrent requests for it."""
+
+    async def generate_and_cache() -> Optional[bytes]:
+        aged_image = await generator.generate_aged_image(name, age_group)
+
+        if aged_image:
+            # Cache the result unless another writer got there first
+            age_field = f"age_versions.{age_group}"
+            stored = await _store_image(request, bucket, f"{image_id}-{age_group}", aged_image)
+            updated = await db.baby_images.find_one_and_update(
+                {"_id": image_id, age_field: {"$exists": False}},
+                {"$set": {age_field: stored.file_id}},
+                projection={"_id": 1}
+            )
+            if updated is not None:
+                _remember_stored_image(request, stored)
+            elif stored.created:
+                await bucket.delete(stored.file_id)
+
+        return aged_image
+
+    return await coalesce(_get_age_progress_inflight(request), (image_id, age_group), generate_and_cache)
 
 
 @asynccontextmanager
@@ -181,16 +312,33 @@ async def lifespan(app: FastAPI):
         missing = [name for name, value in {"MONGO_URL": mongo_url, "DB_NAME": db_name}.items() if not value]
         raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
 
-    client = AsyncIOMotorClient(mongo_url)
+    # zstd wire compression shrinks the base64-heavy traffic; zlib is the fallback
+    client = AsyncIOMotorClient(mongo_url, maxPoolSize=50, compressors="zstd,zlib")
+    warm_up_task: Optional[asyncio.Task] = None
 
     try:
         app.state.mongo_client = client
         app.state.db = client[db_name]
+        app.state.image_bucket = AsyncIOMotorGridFSBucket(app.state.db, bucket_name="baby_image_files")
+        await _create_indexes(app.state.db)
         app.state.agent_config = AgentConfig()
-        app.state.agent_cache = {}
+        app.state.agent_cache = {
+            "search": SearchAgent(app.state.agent_config),
+            "chat": ChatAgent(app.state.agent_config),
+        }
+        app.state.baby_generator = BabyImageGenerator(app.state.agent_config)
+        # Warm up in the background so it does not delay readiness
+        warm_up_task = asyncio.create_task(app.state.baby_generator.warm_up())
         logger.info("AI Agents API starting up")
         yield
     finally:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+            # Let the cancelled warm-up unwind before the generator is closed
+            await asyncio.gather(warm_up_task, return_exceptions=True)
+        baby_generator = getattr(app.state, "baby_generator", None)
+        if baby_generator is not None:
+            await baby_generator.close()
         client.close()
         logger.info("AI Agents API shutdown complete")
 
@@ -199,6 +347,7 @@ app = FastAPI(
     title="AI Agents API",
     description="Minimal AI Agents API with LangGraph and MCP support",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 api_router = APIRouter(prefix="/api")
@@ -220,7 +369,9 @@ async def create_status_check(input: StatusCheckCreate, request: Request):
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks(request: Request):
     db = _ensure_db(request)
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await db.status_checks.find(
+        {}, {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+    ).to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
 
@@ -316,34 +467,37 @@ async def generate_baby_image(baby_request: BabyGenerateRequest, request: Reques
     """Generate a photorealistic baby image from a name."""
     try:
         db = _ensure_db(request)
+        bucket = _ensure_image_bucket(request)
         generator = _get_baby_generator(request)
 
         # Generate baby image
-        image_data = await generator.generate_baby_image(baby_request.name)
+        image_content = await generator.generate_baby_image(baby_request.name)
 
-        if not image_data:
+        if not image_content:
             return BabyGenerateResponse(
                 success=False,
                 image_id="",
                 error="Failed to generate baby image"
             )
 
-        # Create image record
+        # Store the image in GridFS and keep only its id on the record
         image_id = str(uuid.uuid4())
+        stored = await _store_image(request, bucket, f"{image_id}-original", image_content)
         baby_record = {
             "_id": image_id,
             "name": baby_request.name,
-            "original_image": image_data,
+            "original_image_id": stored.file_id,
             "age_versions": {},
             "created_at": datetime.now(timezone.utc)
         }
 
         await db.baby_images.insert_one(baby_record)
+        _remember_stored_image(request, stored)
 
         return BabyGenerateResponse(
             success=True,
             image_id=image_id,
-            image_data=image_data
+            image_data=_encode_image(image_content)
         )
 
     except HTTPException:
@@ -362,10 +516,14 @@ async def age_progress_image(age_request: AgeProgressRequest, request: Request):
     """Generate an age-progressed version of the baby."""
     try:
         db = _ensure_db(request)
+        bucket = _ensure_image_bucket(request)
         generator = _get_baby_generator(request)
 
-        # Check if we already have this age version cached
-        baby_record = await db.baby_images.find_one({"_id": age_request.image_id})
+        age_field = f"age_versions.{age_request.age_group}"
+        projection = {age_field: 1}
+
+        # Check if we already have this age version cached, fetching only that field
+        baby_record = await db.baby_images.find_one({"_id": age_request.image_id}, projection)
 
         if not baby_record:
             return AgeProgressResponse(
@@ -374,19 +532,18 @@ async def age_progress_image(age_request: AgeProgressRequest, request: Request):
                 error="Baby image not found"
             )
 
-        # Check cache first
-        age_versions = baby_record.get("age_versions", {})
-        if age_request.age_group in age_versions:
+        cached_image = baby_record.get("age_versions", {}).get(age_request.age_group)
+        if cached_image:
             return AgeProgressResponse(
                 success=True,
-                image_data=age_versions[age_request.age_group],
+                image_data=await _load_image(bucket, cached_image),
                 age_group=age_request.age_group
             )
 
-        # Generate aged image
-        aged_image = await generator.generate_aged_image(
-            age_request.name,
-            age_request.age_group
+        # Coalesce concurrent requests: the first caller generates, the rest await its result
+        aged_image = await _generate_age_version(
+            request, generator, db, bucket,
+            age_request.image_id, age_request.name, age_request.age_group
         )
 
         if not aged_image:
@@ -396,15 +553,9 @@ async def age_progress_image(age_request: AgeProgressRequest, request: Request):
                 error="Failed to generate aged image"
             )
 
-        # Cache the result
-        await db.baby_images.update_one(
-            {"_id": age_request.image_id},
-            {"$set": {f"age_versions.{age_request.age_group}": aged_image}}
-        )
-
         return AgeProgressResponse(
             success=True,
-            image_data=aged_image,
+            image_data=_encode_image(aged_image),
             age_group=age_request.age_group
         )
 
@@ -419,13 +570,75 @@ async def age_progress_image(age_request: AgeProgressRequest, request: Request):
         )
 
 
+@api_router.post("/baby/age-progress/bulk", response_model=AgeProgressBulkResponse)
+async def age_progress_bulk(bulk_request: AgeProgressBulkRequest, request: Request):
+    """Generate several age-progressed versions of the baby concurrently."""
+    try:
+        db = _ensure_db(request)
+        bucket = _ensure_image_bucket(request)
+        generator = _get_baby_generator(request)
+
+        # Only fetch the requested age versions, not the whole record
+        age_groups = list(dict.fromkeys(bulk_request.age_groups))
+        baby_record = await db.baby_images.find_one(
+            {"_id": bulk_request.image_id},
+            {"_id": 1, **{f"age_versions.{age_group}": 1 for age_group in age_groups}}
+        )
+
+        if not baby_record:
+            return AgeProgressBulkResponse(
+                success=False,
+                error="Baby image not found"
+            )
+
+        # Only generate the age groups that are not cached yet
+        age_versions = baby_record.get("age_versions", {})
+        missing = [age_group for age_group in age_groups if age_group not in age_versions]
+
+        # Each age group goes through the same coalesced, conditional write as /baby/age-progress
+        results = await asyncio.gather(
+            *(
+                _generate_age_version(
+                    request, generator, db, bucket,
+                    bulk_request.image_id, bulk_request.name, age_group
+                )
+                for age_group in missing
+            )
+        )
+        generated = {age_group: content for age_group, content in zip(missing, results) if content}
+
+        cached = [age_group for age_group in age_groups if age_group in age_versions]
+        loaded = await asyncio.gather(*(_load_image(bucket, age_versions[age_group]) for age_group in cached))
+        images = dict(zip(cached, loaded))
+        images.update({age_group: _encode_image(content) for age_group, content in generated.items()})
+        failed = [age_group for age_group in missing if age_group not in generated]
+
+        return AgeProgressBulkResponse(
+            success=not failed,
+            images={age_group: images[age_group] for age_group in age_groups if age_group in images},
+            error=f"Failed to generate aged images: {', '.join(failed)}" if failed else None
+        )
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.exception("Error generating aged images")
+        return AgeProgressBulkResponse(
+            success=False,
+            error=str(exc)
+        )
+
+
 @api_router.post("/baby/watermark", response_model=WatermarkResponse)
 async def add_watermark_to_image(watermark_request: WatermarkRequest, request: Request):
     """Add name and age watermark to the image."""
     try:
         generator = _get_baby_generator(request)
 
-        watermarked_image = generator.add_watermark(
+        # Watermarking is CPU-bound; keep it off the event loop
+        watermarked_image = await asyncio.get_running_loop().run_in_executor(
+            None,
+            generator.add_watermark,
             watermark_request.image_data,
             watermark_request.name,
             watermark_request.age
@@ -446,6 +659,34 @@ async def add_watermark_to_image(watermark_request: WatermarkRequest, request: R
         )
 
 
+@api_router.post("/baby/watermark/raw")
+async def add_watermark_to_image_raw(watermark_request: WatermarkRequest, request: Request):
+    """Add name and age watermark and return the image as raw JPEG bytes."""
+    generator = _get_baby_generator(request)
+
+    try:
+        image_data = base64.b64decode(watermark_request.image_data, validate=False)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data") from exc
+
+    try:
+        # Watermarking is CPU-bound; keep it off the event loop
+        watermarked_image = await asyncio.get_running_loop().run_in_executor(
+            None,
+            generator.add_watermark_bytes,
+            image_data,
+            watermark_request.name,
+            watermark_request.age
+        )
+    except (UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid image data") from exc
+    except Exception as exc:
+        logger.exception("Error adding watermark")
+        raise HTTPException(status_code=500, detail="Failed to add watermark") from exc
+
+    return Response(content=watermarked_image, media_type="image/jpeg")
+
+
 @api_router.post("/track", response_model=LinkTrackResponse)
 async def track_link(track_request: LinkTrackRequest, request: Request):
     """Track link clicks and actions. Tool remains free - tracking is for analytics only."""
@@ -494,7 +735,9 @@ async def get_link_stats(link_id: str, request: Request):
         db = _ensure_db(request)
 
         # Get all tracking records for this link
-        records = await db.link_tracking.find({"link_id": link_id}).to_list(10000)
+        records = await db.link_tracking.find(
+            {"link_id": link_id}, {"_id": 0, "action": 1, "timestamp": 1}
+        ).to_list(10000)
 
         # Calculate stats
         total_clicks = len(records)
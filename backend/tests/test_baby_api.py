@@ -88,9 +88,42 @@ def test_age_progression(image_id: str, name: str):
     return test_image
 
 
+def test_age_progression_bulk(image_id: str, name: str):
+    """Test concurrent age progression for several age groups."""
+    print("\n=== Test 3: Bulk Age Progression ===")
+
+    age_groups = ["child", "teen"]
+
+    response = requests.post(
+        f"{API_URL}/baby/age-progress/bulk",
+        json={
+            "image_id": image_id,
+            "name": name,
+            "age_groups": age_groups
+        },
+        timeout=180
+    )
+
+    print(f"Status Code: {response.status_code}")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+
+    data = response.json()
+    print(f"Response: success={data.get('success')}, age_groups={list(data.get('images', {}))}")
+
+    assert data["success"] is True, "Bulk age progression should succeed"
+    assert set(data["images"]) == set(age_groups), "Should return an image for every age group"
+
+    for age_group, image_data in data["images"].items():
+        try:
+            base64.b64decode(image_data)
+            print(f"✓ Valid base64 image data for {age_group}")
+        except Exception as e:
+            raise AssertionError(f"Invalid base64 data for {age_group}: {e}")
+
+
 def test_watermark(image_data: str, name: str):
     """Test watermark application."""
-    print("\n=== Test 3: Watermark Application ===")
+    print("\n=== Test 4: Watermark Application ===")
 
     response = requests.post(
         f"{API_URL}/baby/watermark",
@@ -119,6 +152,27 @@ def test_watermark(image_data: str, name: str):
         raise AssertionError(f"Invalid watermarked image: {e}")
 
 
+def test_watermark_raw(image_data: str, name: str):
+    """Test watermark application returning raw JPEG bytes."""
+    print("\n=== Test 5: Raw Watermark Application ===")
+
+    response = requests.post(
+        f"{API_URL}/baby/watermark/raw",
+        json={
+            "image_data": image_data,
+            "name": name,
+            "age": "Child"
+        },
+        timeout=30
+    )
+
+    print(f"Status Code: {response.status_code}")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["content-type"] == "image/jpeg", "Should return a JPEG image"
+    assert response.content[:3] == b"\xff\xd8\xff", "Should return JPEG data"
+    print(f"✓ Valid watermarked JPEG ({len(response.content)} bytes)")
+
+
 def main():
     """Run all tests."""
     print("=" * 60)
@@ -133,9 +187,15 @@ def main():
         # Test 2: Age progression
         test_image = test_age_progression(image_id, name)
 
-        # Test 3: Watermark
+        # Test 3: Bulk age progression
+        test_age_progression_bulk(image_id, name)
+
+        # Test 4: Watermark
         test_watermark(test_image, name)
 
+        # Test 5: Raw watermark
+        test_watermark_raw(test_image, name)
+
         print("\n" + "=" * 60)
         print("✓ ALL TESTS PASSED")
         print("=" * 60)